@@ -1,10 +1,20 @@
+import asyncio
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
 import streamlit as st
 import yfinance as yf
 import pandas as pd
-from datetime import datetime
-import pandas_ta as ta
-import plotly.graph_objects as go
-import yoptions as yo
+import numpy as np
+from datetime import datetime, timedelta
+# TA-Lib, Plotly and SciPy are imported where they're used, so the sidebar paints before they load
 
 # --- 1. PAGE SETUP ---
 st.set_page_config(page_title="Indian Options Dashboard", layout="wide")
@@ -23,72 +33,405 @@ st.sidebar.subheader("Module 2/3/4: Deep Dive")
 deep_dive_ticker = st.sidebar.text_input("Enter a Single Ticker for Analysis", "RELIANCE.NS").upper()
 
 
+# --- ON-DISK CACHE FOR YAHOO ENDPOINTS ---
+IST = ZoneInfo("Asia/Kolkata")
+
+def prune_expired(folder):
+    # Per-expiry cache files are named {YYYY-MM-DD}_...; drop those whose expiry has passed
+    today = datetime.now(IST).date().isoformat()
+    for old in folder.glob("????-??-??_*"):
+        if old.name[:10] < today:
+            old.unlink(missing_ok=True)
+
+class FileCache:
+    """Pickled values under .cache/{endpoint}/, each with a JSON sidecar holding (timestamp, ttl).
+
+    Unlike st.cache_data this survives process restarts and redeploys.
+    """
+
+    def __init__(self, root=".cache"):
+        self.root = Path(root)
+
+    def _paths(self, endpoint, ticker, expiry):
+        key = hashlib.md5(f"{ticker}|{endpoint}|{expiry}".encode()).hexdigest()
+        if expiry:
+            key = f"{expiry}_{key}"  # Lets prune_expired find entries for past expiries
+        folder = self.root / endpoint
+        return folder / f"{key}.pkl", folder / f"{key}.meta.json"
+
+    def get(self, endpoint, ticker, expiry=""):
+        blob, meta = self._paths(endpoint, ticker, expiry)
+        try:
+            stamp = json.loads(meta.read_text())
+            if time.time() - stamp['timestamp'] > stamp['ttl']:
+                return None
+            with blob.open('rb') as f:
+                return pickle.load(f)
+        except Exception:
+            return None  # Missing, corrupt, or pickled by an incompatible pandas/yfinance: treat as a miss
+
+    def set(self, endpoint, ticker, value, ttl, expiry=""):
+        blob, meta = self._paths(endpoint, ticker, expiry)
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        if expiry:
+            prune_expired(blob.parent)
+        # Write-then-rename so concurrent scanner threads never read a partial file
+        tmp = blob.with_suffix(f".{threading.get_ident()}.tmp")
+        with tmp.open('wb') as f:
+            pickle.dump(value, f)
+        os.replace(tmp, blob)
+        meta.write_text(json.dumps({'timestamp': time.time(), 'ttl': ttl}))
+
+    def fetch(self, endpoint, ticker, ttl, loader, expiry="", keep=bool):
+        value = self.get(endpoint, ticker, expiry)
+        # keep also vets what's on disk, so an entry that has gone bad before its TTL is refetched
+        if value is None or not keep(value):
+            value = loader()
+            # yfinance returns empty results when Yahoo fails or rate-limits; don't pin those on disk
+            if keep(value):
+                self.set(endpoint, ticker, value, ttl, expiry)
+        return value
+
+file_cache = FileCache()
+
+@st.cache_resource(ttl=600, show_spinner=False)
+def get_ticker(ticker):
+    # Reusing the Ticker across reruns keeps yfinance's memoized quote and expiry responses
+    return yf.Ticker(ticker)
+
+def info_ttl():
+    # Quotes move during NSE hours (09:15-15:30 IST, Mon-Fri); overnight they are static
+    now = datetime.now(IST)
+    market_open = now.weekday() < 5 and (9, 15) <= (now.hour, now.minute) <= (15, 30)
+    if market_open:
+        return 15 * 60
+    # Never let an overnight entry outlive the next open
+    next_open = now.replace(hour=9, minute=15, second=0, microsecond=0)
+    if next_open <= now:
+        next_open += timedelta(days=1)
+    while next_open.weekday() >= 5:
+        next_open += timedelta(days=1)
+    return min(4 * 3600, int((next_open - now).total_seconds()))
+
+def cached_info(stock):
+    return file_cache.fetch('info', stock.ticker, info_ttl(), lambda: stock.info,
+                            keep=lambda info: 'averageVolume' in info and 'volume' in info)
+
+def cached_options(stock):
+    # The list is cached for a day, but weekly expiries pass mid-day; never hand out a past date
+    today = datetime.now(IST).date().isoformat()
+    def loader():
+        return tuple(d for d in stock.options if d >= today)
+    dates = file_cache.fetch('options', stock.ticker, 24 * 3600, loader,
+                             keep=lambda dates: bool(dates) and dates[0] >= today)
+    return tuple(d for d in dates if d >= today)
+
+def cached_option_chain(stock, expiry):
+    # yfinance's Options namedtuple can't be pickled, so store its fields instead
+    def loader():
+        chain = stock.option_chain(expiry)
+        return {'calls': chain.calls, 'puts': chain.puts, 'underlying': chain.underlying}
+    return SimpleNamespace(**file_cache.fetch('option_chain', stock.ticker, 15 * 60, loader, expiry,
+                                              keep=lambda chain: not chain['calls'].empty))
+
+def cached_nearest_chain(stock):
+    # Without a date yfinance returns the nearest expiry in the same request as the expiry list;
+    # ATM IV only needs strike and IV, so that's all that gets kept
+    def loader():
+        return {'calls': stock.option_chain().calls[['strike', 'impliedVolatility']]}
+    return SimpleNamespace(**file_cache.fetch('nearest_chain', stock.ticker, 15 * 60, loader,
+                                              keep=lambda chain: not chain['calls'].empty))
+
+@st.cache_data(ttl=600, show_spinner=False)
+def atm_iv(ticker, spot):
+    # Nearest-expiry ATM IV %, shared by the scanner and Module 4. Raises rather than
+    # returning a placeholder when Yahoo gives nothing usable, so st.cache_data won't pin it.
+    calls = cached_nearest_chain(get_ticker(ticker)).calls
+    if spot <= 0 or calls.empty:
+        raise ValueError(f"No nearest-expiry option chain available for {ticker}")
+    atm_idx = np.abs(calls['strike'].to_numpy() - spot).argmin()
+    iv = calls['impliedVolatility'].iloc[atm_idx]
+    if not iv > 0:
+        raise ValueError(f"Yahoo reported no implied volatility at the ATM strike for {ticker}")
+    return float(iv * 100)
+
+GREEKS_TTL = 15 * 60  # cached_options only hands out live expiries, whose Greeks drift through the day
+
+RISK_FREE_RATE = 0.07
+
+def black_scholes_greeks(contracts, spot, expiry, option_type):
+    # One vectorized pass over every strike, using Yahoo's own implied volatility
+    from scipy.stats import norm
+    expiry_close = datetime.strptime(expiry, "%Y-%m-%d").replace(hour=15, minute=30, tzinfo=IST)
+    years = max((expiry_close - datetime.now(IST)).total_seconds(), 60) / (365 * 24 * 3600)
+    strike = contracts['strike'].to_numpy(dtype=np.float64)
+    iv = contracts['impliedVolatility'].to_numpy(dtype=np.float64)
+    sigma = np.where(iv > 0, iv, np.nan)  # Yahoo reports 0 IV for untraded strikes
+    sqrt_t = np.sqrt(years)
+
+    d1 = (np.log(spot / strike) + (RISK_FREE_RATE + 0.5 * sigma ** 2) * years) / (sigma * sqrt_t)
+    d2 = d1 - sigma * sqrt_t
+    pdf_d1 = norm.pdf(d1)
+    decay = -spot * pdf_d1 * sigma / (2 * sqrt_t)
+    carry = RISK_FREE_RATE * strike * np.exp(-RISK_FREE_RATE * years)
+    if option_type == 'c':
+        delta = norm.cdf(d1)
+        theta = decay - carry * norm.cdf(d2)
+    else:
+        delta = norm.cdf(d1) - 1
+        theta = decay + carry * norm.cdf(-d2)
+
+    return pd.DataFrame({
+        'Strike': strike,
+        'Last Price': contracts['lastPrice'].to_numpy(),
+        'Impl. Volatility': iv,
+        'Delta': delta,
+        'Theta': theta / 365,  # Per calendar day
+        'Gamma': pdf_d1 / (spot * sigma * sqrt_t),
+        'Vega': spot * pdf_d1 * sqrt_t / 100,  # Per 1 vol point
+        'Open Interest': contracts['openInterest'].to_numpy(),
+        'Volume': contracts['volume'].to_numpy(),
+    })
+
+@st.cache_resource
+def _greeks_store():
+    # (ticker, expiry, option_type, spot) -> (Parquet path, write time), shared by every session in the process
+    return {}
+
+def _chain_greeks(ticker, expiry, option_type, spot):
+    # Greeks depend on spot, so it is part of both the key and the file name
+    spot = round(float(spot), 2)
+    path = Path(".cache/options_data") / ticker / f"{expiry}_{option_type}_{spot:.2f}.parquet"
+    key = (ticker, expiry, option_type, spot)
+    store = _greeks_store()
+    now = time.time()
+    for stale in [k for k, (_, written_at) in list(store.items()) if now - written_at >= GREEKS_TTL]:
+        store.pop(stale, None)
+    if key not in store and path.exists():
+        store[key] = (path, path.stat().st_mtime)  # Written by an earlier process
+    cached_path, written_at = store.get(key, (None, 0))
+    if cached_path == path and now - written_at < GREEKS_TTL:
+        try:
+            return pd.read_parquet(path)
+        except Exception:
+            store.pop(key, None)  # Unreadable (e.g. truncated by a crash); recompute below
+
+    chain = cached_option_chain(get_ticker(ticker), expiry)
+    df = black_scholes_greeks(chain.calls if option_type == 'c' else chain.puts, spot, expiry, option_type)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        prune_expired(path.parent)
+        for superseded in path.parent.glob(f"{expiry}_{option_type}_*.parquet"):
+            if superseded != path:
+                superseded.unlink(missing_ok=True)  # Same contract at an older spot
+        # Write-then-rename, as in FileCache.set, so other sessions never read a partial file
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        df.to_parquet(tmp, compression='snappy')
+        os.replace(tmp, path)
+        store[key] = (path, time.time())
+    except Exception:
+        pass  # A failed cache write shouldn't stop the chain from rendering
+    return df
+
+def get_greeks(ticker, expiry, spot):
+    # Not st.cache_data: warm reads come straight from Parquet instead of a pickle round trip
+    return _chain_greeks(ticker, expiry, 'c', spot), _chain_greeks(ticker, expiry, 'p', spot)
+
+
+# --- PRICE DATA (Modules 1 & 2) ---
+@st.cache_data(ttl=600)
+def load_prices(tickers, period="1y"):
+    # One batched, threaded download per ticker set, cached on (tickers, period)
+    # multi_level_index keeps (Ticker, Price) columns even for a single-ticker download
+    return yf.download(list(tickers), period=period, group_by='ticker', threads=True, progress=False,
+                       auto_adjust=True, multi_level_index=True)
+
+def ticker_history(prices, ticker):
+    if ticker not in prices.columns.get_level_values(0):
+        return pd.DataFrame()
+    return prices[ticker].dropna(how='all').copy()
+
+def last_close(prices, ticker):
+    closes = ticker_history(prices, ticker).get('Close', pd.Series(dtype=float)).dropna()
+    return float(closes.iloc[-1]) if not closes.empty else 0
+
+# Scanner and deep dive download separately, so typing a new deep-dive ticker only fetches that one symbol
+scan_prices = pd.DataFrame()
+
 # --- 3. MODULE 1: MARKET & VOLATILITY SCANNER ---
 st.title("Module 1: Market & Volatility Scanner (NSE)")
 st.info("ℹ️ Remember to use the .NS suffix for all Indian stocks (e.g., INFY.NS for Infosys).")
 
+def _scan_one(ticker, current_price):
+    try:
+        stock = get_ticker(ticker)
+        info = cached_info(stock)  # Only needed for volume fields, which aren't in OHLCV
+        avg_volume = info.get('averageVolume', 1)
+        current_volume = info.get('volume', 0)
+        volume_ratio = f"{(current_volume / avg_volume):.2f}x" if avg_volume > 0 else "N/A"
+
+        if not cached_options(stock):
+            iv_text = "0.0%"  # No listed options
+        else:
+            try:
+                iv_text = f"{atm_iv(ticker, current_price):.1f}%"
+            except Exception:
+                iv_text = "N/A"
+
+        return {
+            'Ticker': ticker, 'Price': f"₹{current_price:.2f}",
+            'ATM IV %': iv_text, 'Stock Vol. Ratio': volume_ratio
+        }
+    except Exception:
+        return {'Ticker': ticker, 'Price': "N/A", 'ATM IV %': "N/A", 'Stock Vol. Ratio': "N/A"}
+
+@st.cache_resource
+def _scan_lock():
+    # One lock per server process, so overlapping reruns don't scan concurrently
+    return threading.Lock()
+
+async def _scan_all(ticker_list, prices, progress_bar):
+    semaphore = asyncio.Semaphore(5)  # At most 5 tickers in flight, to stay under Yahoo's 429 limit
+    done = 0
+
+    async def scan(ticker):
+        nonlocal done
+        async with semaphore:
+            row = await asyncio.to_thread(_scan_one, ticker, last_close(prices, ticker))
+        done += 1
+        progress_bar.progress(done / len(ticker_list), text=f"Scanned {ticker}...")
+        return row
+
+    # gather keeps this on Python < 3.11; _scan_one never raises, so there's nothing for a TaskGroup to cancel
+    return await asyncio.gather(*(scan(ticker) for ticker in ticker_list))
+
 @st.cache_data(ttl=600)
-def get_scan_data(ticker_list):
-    scan_results = []
+def get_scan_data(ticker_list, _prices):
+    # _prices is derived from ticker_list, so it is left out of the cache key
     progress_bar = st.progress(0, text="Running Scan...")
-    
-    for i, ticker in enumerate(ticker_list):
-        try:
-            stock = yf.Ticker(ticker)
-            info = stock.info
-            current_price = info.get('currentPrice', info.get('regularMarketPrice', 0))
-            avg_volume = info.get('averageVolume', 1)
-            current_volume = info.get('volume', 0)
-            volume_ratio = f"{(current_volume / avg_volume):.2f}x" if avg_volume > 0 else "N/A"
-
-            atm_iv = 0
-            exp_dates = stock.options
-            if exp_dates:
-                chain = stock.option_chain(exp_dates[0])
-                if current_price > 0 and not chain.calls.empty:
-                    atm_call = chain.calls.iloc[(chain.calls['strike'] - current_price).abs().argsort()[0]]
-                    atm_iv = atm_call.get('impliedVolatility', 0) * 100
-
-            scan_results.append({
-                'Ticker': ticker, 'Price': f"₹{current_price:.2f}",
-                'ATM IV %': f"{atm_iv:.1f}%", 'Stock Vol. Ratio': volume_ratio
-            })
-        except Exception:
-            scan_results.append({'Ticker': ticker, 'Price': "N/A", 'ATM IV %': "N/A", 'Stock Vol. Ratio': "N/A"})
-        
-        progress_bar.progress((i + 1) / len(ticker_list), text=f"Scanning {ticker}...")
+    with _scan_lock():
+        scan_results = asyncio.run(_scan_all(ticker_list, _prices, progress_bar))
     progress_bar.empty()
     return pd.DataFrame(scan_results)
 
 if ticker_list:
-    df_scan = get_scan_data(ticker_list)
-    st.subheader("Scan Results")
-    st.dataframe(df_scan, width='stretch')
+    try:
+        scan_prices = load_prices(tuple(ticker_list))
+    except Exception as e:
+        st.error(f"Could not download scanner prices: {e}")
+    else:
+        df_scan = get_scan_data(ticker_list, scan_prices)
+        st.subheader("Scan Results")
+        st.dataframe(df_scan, width='stretch')
 
 
 # --- 4. MODULES 2, 3, & 4: DEEP DIVE SECTION ---
+def signal_statuses(stock_data):
+    # Vectorized over the whole history, so a backtest view can reuse it row by row
+    close = stock_data['Close'].to_numpy()
+    rsi = stock_data['RSI_14'].to_numpy()
+    band = np.select([close > stock_data['BBU_20_2.0'].to_numpy(), close < stock_data['BBL_20_2.0'].to_numpy()],
+                     ["At Upper Band (Bearish 🐻)", "At Lower Band (Bullish 🐂)"], default="In Channel (Neutral ➖)")
+    rsi_status = np.select([rsi > 70, rsi < 30],
+                           ["Overbought (Bearish 🐻)", "Oversold (Bullish 🐂)"], default="Neutral ➖")
+    macd = np.where(stock_data['MACDh_12_26_9'].to_numpy() > 0,
+                    "Bullish Crossover (Bullish 🐂)", "Bearish Crossover (Bearish 🐻)")
+    return pd.DataFrame({'band': band, 'rsi': rsi_status, 'macd': macd}, index=stock_data.index)
+
+SELL_PE = ("💡 Strategy: Sell Put Option (PE)",
+           "**Why:** IV is high ({iv:.1f}%), so premium is rich. The stock is **Oversold**, suggesting a bounce. Selling a PE collects this premium (Bullish).")
+SELL_CE = ("💡 Strategy: Sell Call Option (CE)",
+           "**Why:** IV is high ({iv:.1f}%), so premium is rich. The stock is **Overbought**, suggesting a pullback. Selling a CE collects this premium (Bearish).")
+SHORT_STRANGLE = ("💡 Strategy: Short Strangle (Sell OTM CE & PE)",
+                  "**Why:** IV is very high ({iv:.1f}%) and technicals are neutral. This suggests a 'volatility crush' is possible.")
+BUY_CE = ("💡 Strategy: Buy Call Option (CE)",
+          "**Why:** IV is low ({iv:.1f}%), making options cheap. MACD shows **Bullish Momentum**.")
+BUY_PE = ("💡 Strategy: Buy Put Option (PE)",
+          "**Why:** IV is low ({iv:.1f}%), making options cheap. MACD shows **Bearish Momentum**.")
+BULL_CALL_SPREAD = ("💡 Strategy: Bull Call Spread (Buy CE, Sell higher CE)",
+                    "Technicals are Bullish. A spread defines your risk.")
+BEAR_PUT_SPREAD = ("💡 Strategy: Bear Put Spread (Buy PE, Sell lower PE)",
+                   "Technicals are Bearish. A spread defines your risk.")
+NO_SIGNAL = ("💡 Strategy: No Clear Signal",
+             "Technicals are mixed and IV is moderate. Wait for a clearer setup.")
+
+# (IV bucket, RSI bucket, MACD bucket) -> (suggestion, reasoning template)
+# IV: 0 = low (< 35), 1 = moderate, 2 = high (> 60). RSI: 0 = oversold, 1 = neutral, 2 = overbought. MACD: 0 = bearish, 1 = bullish.
+STRATEGY_TABLE = {
+    # High IV: sell premium, direction from RSI
+    (2, 0, 0): SELL_PE, (2, 0, 1): SELL_PE,
+    (2, 1, 0): SHORT_STRANGLE, (2, 1, 1): SHORT_STRANGLE,
+    (2, 2, 0): SELL_CE, (2, 2, 1): SELL_CE,
+    # Low IV: buy premium, direction from MACD
+    (0, 0, 0): BUY_PE, (0, 0, 1): BUY_CE,
+    (0, 1, 0): BUY_PE, (0, 1, 1): BUY_CE,
+    (0, 2, 0): BUY_PE, (0, 2, 1): BUY_CE,
+    # Moderate IV: spread only when RSI and MACD agree
+    (1, 0, 0): NO_SIGNAL, (1, 0, 1): BULL_CALL_SPREAD,
+    (1, 1, 0): NO_SIGNAL, (1, 1, 1): NO_SIGNAL,
+    (1, 2, 0): BEAR_PUT_SPREAD, (1, 2, 1): NO_SIGNAL,
+}
+
+def strategy_key(iv, rsi_status, macd_status):
+    iv_b = 0 if iv < 35 else 2 if iv > 60 else 1
+    rsi_b = 0 if rsi_status.startswith("Oversold") else 2 if rsi_status.startswith("Overbought") else 1
+    macd_b = 1 if macd_status.startswith("Bullish") else 0
+    return iv_b, rsi_b, macd_b
+
+def technical_summary(stock_data):
+    # Three comparisons on one row: cheaper to redo than to hash and cache
+    latest = signal_statuses(stock_data.tail(1)).iloc[-1]
+    return str(latest['band']), str(latest['rsi']), str(latest['macd'])
+
 st.title("---")
 st.title(f"Deep Dive: {deep_dive_ticker}")
 
+@st.fragment
+def render_option_chain(ticker, exp_dates, spot):
+    # Changing the expiry reruns only this fragment, not Module 2's charts or Module 4's IV fetch
+    st.title("Module 3: Deep Option Chain Analysis")
+    selected_expiry = st.selectbox("Select Expiration Date:", exp_dates, index=0)
+
+    try:
+        call_chain, put_chain = get_greeks(ticker, selected_expiry, spot)
+    except Exception as e:
+        # Fragment reruns don't pass through the page-level handler, so report errors here
+        st.error(f"An error occurred while fetching OPTIONS data for {ticker}.")
+        st.error(f"Here is the exact error: {e}")
+        return
+
+    display_cols = ['Strike', 'Last Price', 'Impl. Volatility', 'Delta', 'Theta', 'Gamma', 'Vega', 'Open Interest', 'Volume']
+    # Format at display time so the columns stay numeric (and sortable) in the table
+    display_formats = {'Impl. Volatility': '{:.2%}', 'Delta': '{:.3f}', 'Theta': '{:.3f}',
+                       'Gamma': '{:.3f}', 'Vega': '{:.3f}'}
+
+    st.subheader(f"Call Option (CE) Chain (Expiry: {selected_expiry})")
+    st.dataframe(call_chain[display_cols].style.format(display_formats), width='stretch')
+
+    st.subheader(f"Put Option (PE) Chain (Expiry: {selected_expiry})")
+    st.dataframe(put_chain[display_cols].style.format(display_formats), width='stretch')
+
 if not deep_dive_ticker:
     st.info("Enter a ticker in the sidebar (Module 2/3/4) for a deep dive.")
 else:
     # --- Data Fetching for Deep Dive ---
     try:
-        stock_yft = yf.Ticker(deep_dive_ticker)
-        info = stock_yft.info
-        current_price = info.get('currentPrice', info.get('regularMarketPrice'))
+        stock_yft = get_ticker(deep_dive_ticker)
+        deep_dive_prices = scan_prices if deep_dive_ticker in ticker_list else load_prices((deep_dive_ticker,))
+        current_price = last_close(deep_dive_prices, deep_dive_ticker)
 
         if current_price is None or current_price == 0:
             st.error(f"Could not fetch a valid CURRENT PRICE for {deep_dive_ticker}. Check symbol or yfinance status.")
         else:
             st.header(f"Analysis for: {deep_dive_ticker} (Current Price: ₹{current_price:.2f})")
             
-            stock_data = stock_yft.history(period="1y", auto_adjust=True)
+            stock_data = ticker_history(deep_dive_prices, deep_dive_ticker)
 
             if stock_data.empty:
                 st.error(f"Could not download HISTORICAL data for {deep_dive_ticker}.")
             else:
+                # Only OHLC feeds the candlestick and TA; Volume would just ride along in every copy
+                stock_data = stock_data[['Open', 'High', 'Low', 'Close']].copy()
                 stock_data.dropna(inplace=True)
                 if stock_data.empty:
                     st.error("No valid historical data found after cleaning.")
@@ -97,66 +440,59 @@ else:
                     st.subheader("Module 2: Underlying Stock Analysis")
                     
                     # Calculate Technical Indicators
-                    stock_data.ta.rsi(append=True)
-                    stock_data.ta.macd(append=True)
-                    stock_data.ta.bbands(append=True)
+                    import talib
+                    close = stock_data['Close'].to_numpy(dtype=np.float64)
+                    stock_data['RSI_14'] = talib.RSI(close, timeperiod=14)
+                    (stock_data['MACD_12_26_9'], stock_data['MACDs_12_26_9'],
+                     stock_data['MACDh_12_26_9']) = talib.MACD(close, fastperiod=12, slowperiod=26, signalperiod=9)
+                    stock_data['BBU_20_2.0'], _, stock_data['BBL_20_2.0'] = talib.BBANDS(close, timeperiod=20, nbdevup=2, nbdevdn=2)
                     stock_data.dropna(inplace=True) # Drop NaNs created by TA
+                    # float32 halves the JSON Plotly ships to the browser; TA above already ran in float64
+                    stock_data = stock_data.astype(np.float32)
                     
                     # --- *** THE FIX IS HERE *** ---
-                    # Check if TA columns were created. Requires at least 20 days of data.
-                    required_cols = ['BBU_20_2.0', 'BBL_20_2.0', 'RSI_14', 'MACDh_12_26_9']
-                    if not all(col in stock_data.columns for col in required_cols):
+                    # TA-Lib fills the warm-up window with NaN, so too little history leaves no rows.
+                    if stock_data.empty:
                         st.error(f"Could not calculate technical indicators for {deep_dive_ticker}.")
                         st.warning("This usually means there is not enough historical data (less than 20 days) for this ticker.")
                     # --- *** END OF FIX *** ---
                     
                     else:
-                        # This code now only runs if all TA columns exist
-                        last_row = stock_data.iloc[-1]
+                        # This code now only runs if the indicators have data
+
+                        import plotly.graph_objects as go
+                        from plotly.subplots import make_subplots
 
-                        # Plot Price & Bollinger Bands
-                        fig = go.Figure()
+                        # Price & Bollinger Bands, RSI and MACD share one figure and one x-axis
+                        fig = make_subplots(rows=3, cols=1, shared_xaxes=True, row_heights=[0.6, 0.2, 0.2],
+                                            vertical_spacing=0.05,
+                                            subplot_titles=("Price & Bollinger Bands",
+                                                            "RSI (Overbought > 70, Oversold < 30)",
+                                                            "MACD (Crossover Indicator)"))
                         fig.add_trace(go.Candlestick(x=stock_data.index,
                                                      open=stock_data['Open'], high=stock_data['High'],
-                                                     low=stock_data['Low'], close=stock_data['Close'], name="Price"))
+                                                     low=stock_data['Low'], close=stock_data['Close'], name="Price"), row=1, col=1)
                         fig.add_trace(go.Scatter(x=stock_data.index, y=stock_data['BBU_20_2.0'], 
-                                                 line=dict(color='rgba(255, 165, 0, 0.5)', width=1), name="Upper Band"))
+                                                 line=dict(color='rgba(255, 165, 0, 0.5)', width=1), name="Upper Band"), row=1, col=1)
                         fig.add_trace(go.Scatter(x=stock_data.index, y=stock_data['BBL_20_2.0'], 
                                                  line=dict(color='rgba(255, 165, 0, 0.5)', width=1), 
-                                                 name="Lower Band", fill='tonexty', fillcolor='rgba(255, 165, 0, 0.1)'))
-                        fig.update_layout(title="Price & Bollinger Bands", xaxis_rangeslider_visible=False)
-                        st.plotly_chart(fig, use_container_width=True)
+                                                 name="Lower Band", fill='tonexty', fillcolor='rgba(255, 165, 0, 0.1)'), row=1, col=1)
+
+                        fig.add_trace(go.Scatter(x=stock_data.index, y=stock_data['RSI_14'], name='RSI'), row=2, col=1)
+                        fig.add_hline(y=70, line_dash="dash", line_color="red", row=2, col=1)
+                        fig.add_hline(y=30, line_dash="dash", line_color="green", row=2, col=1)
 
-                        # Plot RSI & MACD
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            fig_rsi = go.Figure()
-                            fig_rsi.add_trace(go.Scatter(x=stock_data.index, y=stock_data['RSI_14'], name='RSI'))
-                            fig_rsi.add_hline(y=70, line_dash="dash", line_color="red")
-                            fig_rsi.add_hline(y=30, line_dash="dash", line_color="green")
-                            fig_rsi.update_layout(title="RSI (Overbought > 70, Oversold < 30)")
-                            st.plotly_chart(fig_rsi, use_container_width=True)
-                        with col2:
-                            fig_macd = go.Figure()
-                            fig_macd.add_trace(go.Scatter(x=stock_data.index, y=stock_data['MACD_12_26_9'], name='MACD Line', line_color='blue'))
-                            fig_macd.add_trace(go.Scatter(x=stock_data.index, y=stock_data['MACDs_12_26_9'], name='Signal Line', line_color='orange'))
-                            fig_macd.add_bar(x=stock_data.index, y=stock_data['MACDh_12_26_9'], name='Histogram')
-                            fig_macd.update_layout(title="MACD (Crossover Indicator)")
-                            st.plotly_chart(fig_macd, use_container_width=True)
+                        fig.add_trace(go.Scatter(x=stock_data.index, y=stock_data['MACD_12_26_9'], name='MACD Line', line_color='blue'), row=3, col=1)
+                        fig.add_trace(go.Scatter(x=stock_data.index, y=stock_data['MACDs_12_26_9'], name='Signal Line', line_color='orange'), row=3, col=1)
+                        fig.add_trace(go.Bar(x=stock_data.index, y=stock_data['MACDh_12_26_9'], name='Histogram'), row=3, col=1)
+
+                        fig.update_layout(height=900, xaxis_rangeslider_visible=False)
+                        st.plotly_chart(fig, use_container_width=True)
                         
                         # Technical Summary
                         st.subheader("Technical Status Summary")
                         cols_summary = st.columns(3)
-                        if last_row['Close'] > last_row['BBU_20_2.0']: band_status = "At Upper Band (Bearish 🐻)"
-                        elif last_row['Close'] < last_row['BBL_20_2.0']: band_status = "At Lower Band (Bullish 🐂)"
-                        else: band_status = "In Channel (Neutral ➖)"
-                        
-                        if last_row['RSI_14'] > 70: rsi_status = "Overbought (Bearish 🐻)"
-                        elif last_row['RSI_14'] < 30: rsi_status = "Oversold (Bullish 🐂)"
-                        else: rsi_status = "Neutral ➖"
-
-                        if last_row['MACDh_12_26_9'] > 0: macd_status = "Bullish Crossover (Bullish 🐂)"
-                        else: macd_status = "Bearish Crossover (Bearish 🐻)"
+                        band_status, rsi_status, macd_status = technical_summary(stock_data)
                         
                         cols_summary[0].metric("Price vs. Bands", band_status)
                         cols_summary[1].metric("RSI (14)", rsi_status)
@@ -166,81 +502,25 @@ else:
                         # --- MODULE 4: STRATEGY & SUGGESTION ENGINE ---
                         st.title("Module 4: Trade Suggestion Engine")
                         try:
-                            exp_dates = stock_yft.options
+                            exp_dates = cached_options(stock_yft)
                             
                             if not exp_dates:
                                 st.error(f"No option expiration dates found for {deep_dive_ticker}. yfinance may not support options for this ticker.")
                             else:
-                                chain = stock_yft.option_chain(exp_dates[0])
-                                atm_call = chain.calls.iloc[(chain.calls['strike'] - current_price).abs().argsort()[0]]
-                                current_atm_iv = atm_call.get('impliedVolatility', 0) * 100
+                                # Raises without a real IV, which lands in the options error handler below
+                                current_atm_iv = atm_iv(deep_dive_ticker, current_price)
                                 st.metric("Current ATM Implied Volatility (Nearest Expiry)", f"{current_atm_iv:.1f}%")
 
                                 # Suggestion Logic
-                                suggestion, reasoning = "", ""
-                                
-                                if current_atm_iv > 60:
-                                    if rsi_status.startswith("Oversold"):
-                                        suggestion = "💡 Strategy: Sell Put Option (PE)"
-                                        reasoning = f"**Why:** IV is high ({current_atm_iv:.1f}%), so premium is rich. The stock is **Oversold**, suggesting a bounce. Selling a PE collects this premium (Bullish)."
-                                    elif rsi_status.startswith("Overbought"):
-                                        suggestion = "💡 Strategy: Sell Call Option (CE)"
-                                        reasoning = f"**Why:** IV is high ({current_atm_iv:.1f}%), so premium is rich. The stock is **Overbought**, suggesting a pullback. Selling a CE collects this premium (Bearish)."
-                                    else:
-                                        suggestion = "💡 Strategy: Short Strangle (Sell OTM CE & PE)"
-                                        reasoning = f"**Why:** IV is very high ({current_atm_iv:.1f}%) and technicals are neutral. This suggests a 'volatility crush' is possible."
-                                
-                                elif current_atm_iv < 35:
-                                    if macd_status.startswith("Bullish"):
-                                        suggestion = "💡 Strategy: Buy Call Option (CE)"
-                                        reasoning = f"**Why:** IV is low ({current_atm_iv:.1f}%), making options cheap. MACD shows **Bullish Momentum**."
-                                    elif macd_status.startswith("Bearish"):
-                                        suggestion = "💡 Strategy: Buy Put Option (PE)"
-                                        reasoning = f"**Why:** IV is low ({current_atm_iv:.1f}%), making options cheap. MACD shows **Bearish Momentum**."
-                                    else:
-                                        suggestion = "💡 Strategy: Long Straddle (Buy ATM CE & PE)"
-                                        reasoning = f"**Why:** IV is low ({current_atm_iv:.1f}%), making options cheap. This is ideal for betting on a large move."
-                                
-                                else: # Moderate IV
-                                    if macd_status.startswith("Bullish") and rsi_status.startswith("Oversold"):
-                                        suggestion = "💡 Strategy: Bull Call Spread (Buy CE, Sell higher CE)"
-                                        reasoning = "Technicals are Bullish. A spread defines your risk."
-                                    elif macd_status.startswith("Bearish") and rsi_status.startswith("Overbought"):
-                                        suggestion = "💡 Strategy: Bear Put Spread (Buy PE, Sell lower PE)"
-                                        reasoning = "Technicals are Bearish. A spread defines your risk."
-                                    else:
-                                        suggestion = "💡 Strategy: No Clear Signal"
-                                        reasoning = "Technicals are mixed and IV is moderate. Wait for a clearer setup."
+                                suggestion, template = STRATEGY_TABLE[strategy_key(current_atm_iv, rsi_status, macd_status)]
+                                reasoning = template.format(iv=current_atm_iv)
 
                                 st.subheader(suggestion)
                                 st.info(reasoning)
                                 st.warning("⚠️ **Disclaimer:** This is an automated suggestion. This is not financial advice.")
 
                                 # --- MODULE 3: DEEP OPTION CHAIN (GREEKS) ---
-                                st.title("Module 3: Deep Option Chain Analysis")
-                                selected_expiry = st.selectbox("Select Expiration Date:", exp_dates, index=0)
-                                
-                                @st.cache_data(ttl=600)
-                                def get_greeks(ticker, expiry):
-                                    calls = yo.get_chain_greeks_date(ticker, option_type='c', expiration_date=expiry, risk_free_rate=0.07)
-                                    puts = yo.get_chain_greeks_date(ticker, option_type='p', expiration_date=expiry, risk_free_rate=0.07)
-                                    return calls, puts
-
-                                call_chain, put_chain = get_greeks(deep_dive_ticker, selected_expiry)
-                                
-                                display_cols = ['Strike', 'Last Price', 'Impl. Volatility', 'Delta', 'Theta', 'Gamma', 'Vega', 'Open Interest', 'Volume']
-                                
-                                for df in [call_chain, put_chain]:
-                                    if not df.empty:
-                                        df['Impl. Volatility'] = (df['Impl. Volatility'] * 100).round(2).astype(str) + '%'
-                                        for col in ['Delta', 'Theta', 'Vega', 'Gamma']:
-                                            df[col] = df[col].round(3)
-                                
-                                st.subheader(f"Call Option (CE) Chain (Expiry: {selected_expiry})")
-                                st.dataframe(call_chain[display_cols], width='stretch')
-                                
-                                st.subheader(f"Put Option (PE) Chain (Expiry: {selected_expiry})")
-                                st.dataframe(put_chain[display_cols], width='stretch')
+                                render_option_chain(deep_dive_ticker, exp_dates, current_price)
                         
                         except Exception as e:
                             st.error(f"An error occurred while fetching OPTIONS data for {deep_dive_ticker}.")